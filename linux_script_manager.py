@@ -23,6 +23,26 @@ from PIL import Image, ImageTk
 import glob
 import threading
 import json
+import bisect
+import mmap
+import pty
+import re
+import shlex
+import shutil
+import signal
+import struct
+import time
+import uuid
+import gzip
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import lzma
+except ImportError:
+    # 部分精简版Python未编译lzma模块，退回gzip压缩
+    lzma = None
 
 class I18n:
     """国际化翻译类"""
@@ -53,6 +73,17 @@ class I18n:
             'menu_english': '英文',
             'menu_chinese': '中文',
             'press_enter': '按Enter关闭',
+            'logs': '日志',
+            'log_viewer': '运行日志',
+            'log_search': '搜索',
+            'log_prev': '上一页',
+            'log_next': '下一页',
+            'log_page': '页',
+            'log_empty': '暂无运行日志',
+            'log_results': '条匹配',
+            'log_loading': '加载中...',
+            'filter': '筛选',
+            'filter_all': '全部脚本',
         },
         'en': {
             'title': 'Linux Script Manager',
@@ -80,6 +111,17 @@ class I18n:
             'menu_english': 'English',
             'menu_chinese': '中文',
             'press_enter': 'Press Enter to close',
+            'logs': 'Logs',
+            'log_viewer': 'Run Logs',
+            'log_search': 'Search',
+            'log_prev': 'Prev',
+            'log_next': 'Next',
+            'log_page': 'Page',
+            'log_empty': 'No run logs yet',
+            'log_results': 'matches',
+            'log_loading': 'Loading...',
+            'filter': 'Filter',
+            'filter_all': 'All Scripts',
         }
     }
     
@@ -95,6 +137,534 @@ class I18n:
         if lang in self.LANGUAGES:
             self.lang = lang
 
+class ScriptRecord:
+    """单个脚本的信息，使用__slots__减少大量脚本时的内存占用"""
+
+    __slots__ = ('path', 'name', 'display_name', 'description', 'requires_sudo', 'tags', 'icon')
+
+    def __init__(self, path, name, display_name, description, requires_sudo=False, tags=(), icon=None):
+        self.path = path
+        self.name = name
+        self.display_name = display_name
+        self.description = description
+        self.requires_sudo = requires_sudo
+        self.tags = tuple(tags)
+        self.icon = icon
+
+    def sort_key(self):
+        """排序键：显示名称，同名时按路径"""
+        return (self.display_name, self.path)
+
+    def __lt__(self, other):
+        # 供bisect直接比较记录，无需另存一份排序键
+        return self.sort_key() < other.sort_key()
+
+
+class ScriptRegistry:
+    """脚本注册表 - 按显示名称保持有序，并按路径、文件名、权限和标签建立索引
+
+    插入时用二分查找定位，无需每次重新排序；按路径等查找为O(1)。
+    """
+
+    def __init__(self):
+        self._records = []
+        self._by_path = {}
+        self._by_name = {}
+        self._by_sudo = {True: {}, False: {}}
+        self._by_tag = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def add(self, record):
+        """插入或替换脚本（按路径识别）"""
+        old = self._by_path.get(record.path)
+        if old is not None:
+            if old.sort_key() == record.sort_key():
+                # 排序位置不变，原地替换
+                self._records[self._position(old)] = record
+                self._unindex(old)
+                self._index(record)
+                return
+            self.remove(record.path)
+
+        bisect.insort(self._records, record)
+        self._index(record)
+
+    def remove(self, path):
+        """按路径移除脚本"""
+        record = self._by_path.get(path)
+        if record is None:
+            return None
+        del self._records[self._position(record)]
+        self._unindex(record)
+        return record
+
+    def paths(self):
+        """所有脚本路径"""
+        return list(self._by_path)
+
+    def get(self, path):
+        """按路径查找"""
+        return self._by_path.get(path)
+
+    def get_by_name(self, name):
+        """按文件名查找"""
+        return self._by_name.get(name)
+
+    def with_sudo(self, requires_sudo):
+        """按权限筛选，结果保持显示顺序"""
+        return sorted(self._by_sudo[bool(requires_sudo)].values())
+
+    def with_tag(self, tag):
+        """按标签筛选，结果保持显示顺序"""
+        return sorted(self._by_tag.get(tag, {}).values())
+
+    def tags(self):
+        """所有已使用的标签"""
+        return sorted(self._by_tag)
+
+    def set_sudo(self, record, requires_sudo):
+        """修改权限标记并同步索引"""
+        self._by_sudo[record.requires_sudo].pop(record.path, None)
+        record.requires_sudo = bool(requires_sudo)
+        self._by_sudo[record.requires_sudo][record.path] = record
+
+    def _position(self, record):
+        return bisect.bisect_left(self._records, record)
+
+    def _index(self, record):
+        self._by_path[record.path] = record
+        self._by_name[record.name] = record
+        self._by_sudo[bool(record.requires_sudo)][record.path] = record
+        for tag in record.tags:
+            self._by_tag.setdefault(tag, {})[record.path] = record
+
+    def _unindex(self, record):
+        self._by_path.pop(record.path, None)
+        if self._by_name.get(record.name) is record:
+            del self._by_name[record.name]
+        self._by_sudo[bool(record.requires_sudo)].pop(record.path, None)
+        for tag in record.tags:
+            tagged = self._by_tag.get(tag)
+            if tagged is not None:
+                tagged.pop(record.path, None)
+                if not tagged:
+                    del self._by_tag[tag]
+
+
+class RunLogArchive:
+    """运行日志归档 - 每个任务写入独立分段，只追加不修改
+
+    每个分段由数据文件(.log，压缩后为.log.xz或.log.gz)和索引文件(.idx)组成，
+    索引按行记录 (偏移量, 时间戳)，查看器据此分页和搜索，无需把整个日志载入内存。
+    """
+
+    INDEX_RECORD = struct.Struct('<Qd')
+    DATA_SUFFIXES = ('.log', '.log.xz', '.log.gz')
+
+    def __init__(self, log_dir, max_segment_bytes=64 * 1024 * 1024,
+                 compress_after=24 * 3600, max_age=30 * 24 * 3600,
+                 max_total_bytes=1024 * 1024 * 1024):
+        self.log_dir = log_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.compress_after = compress_after
+        self.max_age = max_age
+        self.max_total_bytes = max_total_bytes
+        self._rotate_lock = threading.Lock()
+        os.makedirs(self.log_dir, exist_ok=True)
+
+    def new_job(self, script_name):
+        """为一次运行生成唯一的任务ID（同一进程同一秒内多次运行也不会重复）"""
+        stem = re.sub(r'[^A-Za-z0-9_.-]', '_', script_name.replace('.sh', ''))
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{stem}-{uuid.uuid4().hex[:8]}"
+
+    def segment_base(self, job_id, part):
+        """分段文件路径（不含扩展名）"""
+        return os.path.join(self.log_dir, f"{job_id}.{part:03d}")
+
+    def list_segments(self):
+        """列出所有分段，最新的在前"""
+        bases = [path[:-len('.idx')] for path in glob.glob(os.path.join(self.log_dir, '*.idx'))]
+        return sorted((base for base in bases if self.data_path(base)), reverse=True)
+
+    def data_path(self, base):
+        """分段的数据文件路径，可能已被压缩"""
+        for suffix in self.DATA_SUFFIXES:
+            if os.path.exists(base + suffix):
+                return base + suffix
+        return None
+
+    def line_count(self, base):
+        """分段的行数"""
+        try:
+            return os.path.getsize(base + '.idx') // self.INDEX_RECORD.size
+        except OSError:
+            return 0
+
+    def _open_compressed(self, path):
+        if path.endswith('.xz'):
+            if lzma is None:
+                raise OSError(f"lzma not available: {path}")
+            return lzma.open(path, 'rb')
+        return gzip.open(path, 'rb')
+
+    def _read_index(self, base, start, count):
+        size = self.INDEX_RECORD.size
+        with open(base + '.idx', 'rb') as f:
+            f.seek(start * size)
+            raw = f.read(count * size)
+        return [self.INDEX_RECORD.unpack_from(raw, i * size) for i in range(len(raw) // size)]
+
+    def _read_range(self, path, start, end):
+        """读取数据文件 [start, end) 区间，end为None表示读到末尾"""
+        if path.endswith('.log'):
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b''
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return mm[start:end]
+        # 压缩分段只能顺序解压到目标偏移
+        with self._open_compressed(path) as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start)
+
+    def read_lines(self, base, start, count):
+        """按行号分页读取，返回 [(行号, 时间戳, 文本)]"""
+        total = self.line_count(base)
+        path = self.data_path(base)
+        if path is None or start >= total:
+            return []
+        records = self._read_index(base, start, min(count + 1, total - start))
+        end = records[count][0] if len(records) > count else None
+        records = records[:count]
+        first = records[0][0]
+        chunk = self._read_range(path, first, end)
+        lines = []
+        for i, (offset, stamp) in enumerate(records):
+            stop = records[i + 1][0] if i + 1 < len(records) else len(chunk) + first
+            text = chunk[offset - first:stop - first].decode('utf-8', errors='replace')
+            lines.append((start + i, stamp, text.rstrip('\r\n')))
+        return lines
+
+    def search(self, pattern, limit=500):
+        """在全部历史日志中逐行搜索，返回 [(分段, 行号, 时间戳, 文本)]"""
+        try:
+            regex = re.compile(pattern.encode('utf-8'), re.MULTILINE)
+        except re.error:
+            regex = re.compile(re.escape(pattern.encode('utf-8')), re.MULTILINE)
+
+        results = []
+        for base in self.list_segments():
+            path = self.data_path(base)
+            try:
+                for line_no, stamp, text in self._search_segment(base, path, regex):
+                    results.append((base, line_no, stamp, text))
+                    if len(results) >= limit:
+                        return results
+            except (OSError, ValueError) as e:
+                print(f"Log search error {base}: {e}")
+        return results
+
+    def _search_segment(self, base, path, regex):
+        if path.endswith('.log'):
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    yield from self._match_lines(base, mm, regex)
+        else:
+            with self._open_compressed(path) as f:
+                yield from self._match_lines(base, f, regex)
+
+    def _match_lines(self, base, data, regex):
+        # 每次只匹配一行，压缩与未压缩分段的结果一致
+        for line_no, stamp, line in self._iter_lines(base, data):
+            line = line.rstrip(b'\r\n')
+            if regex.search(line):
+                yield line_no, stamp, line.decode('utf-8', errors='replace')
+
+    def _iter_index(self, base):
+        size = self.INDEX_RECORD.size
+        batch = size * 4096
+        with open(base + '.idx', 'rb') as f:
+            while True:
+                raw = f.read(batch)
+                for i in range(len(raw) // size):
+                    yield self.INDEX_RECORD.unpack_from(raw, i * size)
+                if len(raw) < batch:
+                    break
+
+    def _iter_lines(self, base, data):
+        """按索引划分的行顺序读取data（mmap或解压流）"""
+        line_no, prev = 0, None
+        for record in self._iter_index(base):
+            if prev is not None:
+                yield line_no, prev[1], data.read(record[0] - prev[0])
+                line_no += 1
+            prev = record
+        if prev is not None:
+            yield line_no, prev[1], data.read()
+
+    def compress(self, base):
+        """压缩已结束的分段，索引保持不变"""
+        src = base + '.log'
+        # 使用低压缩级别，旧日志压缩不应占用太多CPU时间
+        if lzma is not None:
+            dst, opener, options = base + '.log.xz', lzma.open, {'preset': 1}
+        else:
+            dst, opener, options = base + '.log.gz', gzip.open, {'compresslevel': 1}
+        tmp = f"{dst}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(src, 'rb') as fin, opener(tmp, 'wb', **options) as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+        os.replace(tmp, dst)
+        os.remove(src)
+        return dst
+
+    def remove(self, base):
+        """删除分段及其索引"""
+        for suffix in self.DATA_SUFFIXES + ('.idx',):
+            if os.path.exists(base + suffix):
+                os.remove(base + suffix)
+
+    def rotate(self):
+        """按时间压缩/删除旧分段，并限制归档总大小"""
+        now = time.time()
+        kept = []
+        for base in self.list_segments():
+            try:
+                path = self.data_path(base)
+                age = now - os.path.getmtime(path)
+                if age > self.max_age:
+                    self.remove(base)
+                    continue
+                if path.endswith('.log') and age > self.compress_after:
+                    path = self.compress(base)
+                kept.append((base, os.path.getsize(path) + os.path.getsize(base + '.idx')))
+            except OSError as e:
+                print(f"Log rotate error {base}: {e}")
+
+        total = sum(size for _, size in kept)
+        # 从最旧的分段开始删除
+        for base, size in reversed(kept):
+            if total <= self.max_total_bytes:
+                break
+            self.remove(base)
+            total -= size
+
+    def open_writer(self, script_name):
+        """为一次运行创建写入器，同时在后台线程轮转旧日志，不推迟脚本启动"""
+        threading.Thread(target=self._rotate_in_background).start()
+        return RunLogWriter(self, self.new_job(script_name))
+
+    def _rotate_in_background(self):
+        # 同一进程内只保留一个轮转任务
+        if not self._rotate_lock.acquire(blocking=False):
+            return
+        try:
+            self.rotate()
+        except OSError as e:
+            print(f"Log rotate error: {e}")
+        finally:
+            self._rotate_lock.release()
+
+    def capture(self, script_name, source):
+        """从管道读取输出写入新分段"""
+        writer = self.open_writer(script_name)
+        try:
+            for chunk in iter(lambda: os.read(source.fileno(), 65536), b''):
+                writer.write(chunk)
+        finally:
+            writer.close()
+
+    def run_in_pty(self, script_name, argv):
+        """在伪终端中运行命令，输出原样回显到当前终端并写入新分段
+
+        脚本的stdin/stdout/stderr都是终端，read -p 提示、\r进度条和pv等行为与直接运行一致。
+        """
+        # Ctrl+C只交给脚本处理；用空处理函数而不是SIG_IGN，避免子进程继承忽略状态
+        signal.signal(signal.SIGINT, lambda signum, frame: None)
+        writer = self.open_writer(script_name)
+
+        def master_read(fd):
+            data = os.read(fd, 65536)
+            if data:
+                writer.write(data)
+            return data
+
+        try:
+            return pty.spawn(argv, master_read)
+        finally:
+            writer.close()
+
+
+class RunLogWriter:
+    """向一个任务的分段追加写入，超过大小上限时切换到下一个分段"""
+
+    # 没有换行的输出（如\r进度条）累积超过此长度时强制作为一行写入
+    MAX_PENDING = 64 * 1024
+
+    def __init__(self, archive, job_id):
+        self.archive = archive
+        self.job_id = job_id
+        self.part = 0
+        self._pending = b''
+        self._open()
+
+    def _open(self):
+        base = self.archive.segment_base(self.job_id, self.part)
+        # 独占创建，任务ID万一重复时报错而不是与另一个写入器交错写入
+        self.data = open(base + '.log', 'xb')
+        self.index = open(base + '.idx', 'xb')
+        self.offset = self.data.tell()
+
+    def write(self, data):
+        """追加一段原始输出，按行拆分写入"""
+        lines = (self._pending + data).split(b'\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self.write_line(line + b'\n')
+        if len(self._pending) > self.MAX_PENDING:
+            self.write_line(self._pending)
+            self._pending = b''
+
+    def write_line(self, line):
+        """追加一行并记录索引"""
+        if self.offset and self.offset + len(line) > self.archive.max_segment_bytes:
+            self._close_files()
+            self.part += 1
+            self._open()
+        self.data.write(line)
+        self.index.write(self.archive.INDEX_RECORD.pack(self.offset, time.time()))
+        self.offset += len(line)
+        # 每行刷新，查看器可以实时看到正在运行的任务
+        self.data.flush()
+        self.index.flush()
+
+    def close(self):
+        """写入剩余输出并关闭当前分段"""
+        if self._pending:
+            self.write_line(self._pending)
+            self._pending = b''
+        self._close_files()
+
+    def _close_files(self):
+        self.data.close()
+        self.index.close()
+
+
+class ImageCache:
+    """共享的图片缓存 - 按 (路径, 尺寸, 修改时间) 缓存PhotoImage，按占用字节数LRU淘汰
+
+    解码和缩放在后台线程完成，PhotoImage只在UI线程创建。
+    被淘汰的图片若仍在控件上显示，由控件自身的引用保持，控件销毁后即释放。
+    """
+
+    def __init__(self, root, max_bytes=32 * 1024 * 1024, workers=2):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._images = OrderedDict()
+        self._pending = {}
+        self._results = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._polling = False
+
+    def _key(self, path, size):
+        path = os.path.abspath(path)
+        return (path, tuple(size), os.path.getmtime(path))
+
+    @staticmethod
+    def _decode(path, size):
+        """打开并缩放图片（可在后台线程执行）"""
+        img = Image.open(path)
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        img = img.resize(size, Image.Resampling.LANCZOS)
+        img.load()
+        return img
+
+    def _lookup(self, key):
+        photo = self._images.get(key)
+        if photo is not None:
+            self._images.move_to_end(key)
+        return photo
+
+    def _store(self, key, img):
+        photo = ImageTk.PhotoImage(img)
+        self._images[key] = photo
+        self.total_bytes += img.width * img.height * 4
+        while self.total_bytes > self.max_bytes and len(self._images) > 1:
+            (_, (w, h), _), _ = self._images.popitem(last=False)
+            self.total_bytes -= w * h * 4
+        return photo
+
+    def get(self, path, size):
+        """同步获取图片，文件不存在或无法解码时返回None"""
+        try:
+            key = self._key(path, size)
+            photo = self._lookup(key)
+            if photo is None:
+                photo = self._store(key, self._decode(key[0], key[1]))
+            return photo
+        except Exception as e:
+            print(f"Load image error {path}: {e}")
+            return None
+
+    def request(self, path, size, callback):
+        """异步获取图片，完成后在UI线程调用 callback(photo)"""
+        try:
+            key = self._key(path, size)
+        except OSError as e:
+            print(f"Load image error {path}: {e}")
+            return
+        photo = self._lookup(key)
+        if photo is not None:
+            callback(photo)
+            return
+        # 同一张图片只解码一次
+        if key in self._pending:
+            self._pending[key].append(callback)
+            return
+        self._pending[key] = [callback]
+        self._executor.submit(self._decode_worker, key)
+        if not self._polling:
+            self._polling = True
+            self.root.after(30, self._poll)
+
+    def _decode_worker(self, key):
+        try:
+            self._results.put((key, self._decode(key[0], key[1]), None))
+        except Exception as e:
+            self._results.put((key, None, e))
+
+    def _poll(self):
+        while True:
+            try:
+                key, img, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            callbacks = self._pending.pop(key, [])
+            if error is not None:
+                print(f"Load image error {key[0]}: {error}")
+                continue
+            photo = self._store(key, img)
+            for callback in callbacks:
+                try:
+                    callback(photo)
+                except tk.TclError:
+                    # 控件在解码期间已被销毁
+                    pass
+
+        if self._pending:
+            self.root.after(30, self._poll)
+        else:
+            self._polling = False
+
+
 class LinuxScriptManager:
     def __init__(self):
         self.root = tk.Tk()
@@ -110,20 +680,27 @@ class LinuxScriptManager:
             os.makedirs(self.script_dir)
             self.create_default_scripts()
         
-        self.scripts = []
+        # 运行日志目录
+        self.log_dir = "./logs"
+        self.log_archive = RunLogArchive(self.log_dir)
+        
+        # 后台任务结果队列，由UI线程轮询
+        self._background_results = queue.Queue()
+        self._background_pending = 0
+        
+        self.scripts = ScriptRegistry()
+        self.script_filter = ('all', None)
         self.load_scripts()
         
         self.photo_image = None
-        self.icon_images = []
+        self.image_cache = ImageCache(self.root)
         
         # 尝试设置窗口图标
         try:
             if os.path.exists('linux-tool.png'):
-                icon_img = Image.open('linux-tool.png')
-                icon_img = icon_img.resize((256, 256), Image.Resampling.LANCZOS)
-                window_icon = ImageTk.PhotoImage(icon_img)
-                self.root.iconphoto(True, window_icon)
-                self.icon_images.append(window_icon)
+                self.window_icon = self.image_cache.get('linux-tool.png', (256, 256))
+                if self.window_icon:
+                    self.root.iconphoto(True, self.window_icon)
         except Exception as e:
             print(f"Icon setup error: {e}")
         
@@ -161,9 +738,9 @@ echo "Execution completed / 执行完成！"
             os.chmod(script_path, 0o755)
     
     def load_scripts(self):
-        """加载scripts目录中的所有脚本"""
-        self.scripts = []
+        """加载scripts目录中的所有脚本 - 增量更新注册表"""
         script_files = glob.glob(os.path.join(self.script_dir, "*.sh"))
+        seen = set()
         
         for script_file in script_files:
             if os.path.isfile(script_file):
@@ -172,9 +749,13 @@ echo "Execution completed / 执行完成！"
                 
                 script_info = self.parse_script_info(script_file)
                 if script_info:
-                    self.scripts.append(script_info)
+                    self.scripts.add(script_info)
+                    seen.add(script_file)
         
-        self.scripts.sort(key=lambda x: x['display_name'])
+        # 移除已删除的脚本
+        for path in self.scripts.paths():
+            if path not in seen:
+                self.scripts.remove(path)
     
     def parse_script_info(self, script_path):
         """解析脚本信息 - 现在支持任意脚本文件"""
@@ -187,6 +768,8 @@ echo "Execution completed / 执行完成！"
             
             requires_sudo = False
             description = self.i18n.t('system_tool')
+            tags = []
+            icon = None
             
             with open(script_path, 'r', encoding='utf-8', errors='ignore') as f:
                 lines = f.readlines()
@@ -199,19 +782,21 @@ echo "Execution completed / 执行完成！"
                         requires_sudo = 'true' in line.lower()
                     elif line.startswith('# DISPLAY_NAME:'):
                         display_name = line.split('# DISPLAY_NAME:')[1].strip()
+                    elif line.startswith('# ICON:'):
+                        # 相对路径以脚本所在目录为基准
+                        icon_path = os.path.expanduser(line.split('# ICON:')[1].strip())
+                        if icon_path:
+                            icon = os.path.join(os.path.dirname(script_path), icon_path)
+                    elif line.startswith('# TAGS:'):
+                        tags = [tag.strip() for tag in line.split('# TAGS:')[1].split(',') if tag.strip()]
                     elif line.startswith('#'):
                         if description == self.i18n.t('system_tool') and len(line) > 2 and not line.startswith('#!/'):
                             potential_desc = line[1:].strip()
-                            if potential_desc and not any(x in potential_desc.upper() for x in ['REQUIRES_SUDO', 'DISPLAY_NAME']):
+                            # 跳过书写不规范的元数据行（如 "#REQUIRES_SUDO true"），普通注释不受影响
+                            if potential_desc and not re.match(r'(REQUIRES_SUDO|DISPLAY_NAME|TAGS|ICON)\b', potential_desc.upper()):
                                 description = potential_desc
             
-            return {
-                'path': script_path,
-                'name': script_name,
-                'display_name': display_name,
-                'description': description,
-                'requires_sudo': requires_sudo
-            }
+            return ScriptRecord(script_path, script_name, display_name, description, requires_sudo, tags, icon)
         except Exception as e:
             print(f"Error parsing script {script_path}: {e}")
             return None
@@ -241,22 +826,10 @@ echo "Execution completed / 执行完成！"
         self.create_footer(main_frame)
     
     def load_icon(self):
-        """加载图标"""
-        try:
-            if os.path.exists('linux-tool.png'):
-                img = Image.open('linux-tool.png')
-                
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-                
-                img = img.resize((80, 80), Image.Resampling.LANCZOS)
-                icon_image = ImageTk.PhotoImage(img)
-                return icon_image
-            else:
-                return None
-        except Exception as e:
-            print(f"Load icon error: {e}")
-            return None
+        """加载图标 - 从共享缓存获取，切换语言时不会重复解码"""
+        if os.path.exists('linux-tool.png'):
+            return self.image_cache.get('linux-tool.png', (80, 80))
+        return None
     
     def create_header(self, parent):
         """创建标题区域"""
@@ -268,7 +841,6 @@ echo "Execution completed / 执行完成！"
         
         self.photo_image = self.load_icon()
         if self.photo_image:
-            self.icon_images.append(self.photo_image)
             icon_label = tk.Label(content_frame, image=self.photo_image, bg='#0f3460', 
                                  bd=0, highlightthickness=0)
             icon_label.image = self.photo_image
@@ -299,6 +871,20 @@ echo "Execution completed / 执行完成！"
     
     def create_scrollable_cards(self, parent):
         """创建带滚动条的卡片区域"""
+        filter_frame = tk.Frame(parent, bg='#0f3460')
+        filter_frame.pack(fill='x')
+        
+        filter_label = tk.Label(filter_frame,
+                               text=self.i18n.t('filter'),
+                               font=('Arial', 9),
+                               fg='#a0a0a0',
+                               bg='#0f3460')
+        filter_label.pack(side='left', padx=(8, 5))
+        
+        self.filter_box = ttk.Combobox(filter_frame, state='readonly', width=24)
+        self.filter_box.pack(side='left')
+        self.filter_box.bind("<<ComboboxSelected>>", self._on_filter_selected)
+        
         cards_main_frame = tk.Frame(parent, bg='#0f3460')
         cards_main_frame.pack(fill='both', expand=True, pady=10)
         
@@ -383,6 +969,9 @@ echo "Execution completed / 执行完成！"
         terminal_btn = self.create_modern_button(btn_frame, self.i18n.t('terminal'), '#9b59b6', self.open_terminal)
         terminal_btn.pack(side='left', padx=5)
         
+        logs_btn = self.create_modern_button(btn_frame, self.i18n.t('logs'), '#27ae60', self.open_log_viewer)
+        logs_btn.pack(side='left', padx=5)
+        
         quit_btn = self.create_modern_button(btn_frame, self.i18n.t('quit'), '#e74c3c', self.root.quit)
         quit_btn.pack(side='left', padx=5)
     
@@ -424,12 +1013,47 @@ echo "Execution completed / 执行完成！"
         
         return f'#{r:02x}{g:02x}{b:02x}'
     
+    def filtered_scripts(self):
+        """按当前筛选条件返回脚本列表"""
+        kind, value = self.script_filter
+        if kind == 'sudo':
+            return self.scripts.with_sudo(value)
+        if kind == 'tag':
+            return self.scripts.with_tag(value)
+        return list(self.scripts)
+    
+    def filter_label(self, option):
+        """筛选项的显示文本"""
+        kind, value = option
+        if kind == 'sudo':
+            return self.i18n.t('requires_sudo') if value else self.i18n.t('normal_user')
+        if kind == 'tag':
+            return f"#{value}"
+        return self.i18n.t('filter_all')
+    
+    def update_filter_options(self):
+        """根据当前标签更新筛选下拉框"""
+        self.filter_options = [('all', None), ('sudo', True), ('sudo', False)]
+        self.filter_options += [('tag', tag) for tag in self.scripts.tags()]
+        if self.script_filter not in self.filter_options:
+            self.script_filter = ('all', None)
+        self.filter_box['values'] = [self.filter_label(option) for option in self.filter_options]
+        self.filter_box.current(self.filter_options.index(self.script_filter))
+    
+    def _on_filter_selected(self, event):
+        """切换筛选条件"""
+        self.script_filter = self.filter_options[self.filter_box.current()]
+        self.display_cards()
+    
     def display_cards(self):
         """显示所有脚本卡片"""
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
         
-        if not self.scripts:
+        self.update_filter_options()
+        scripts = self.filtered_scripts()
+        
+        if not scripts:
             empty_label = tk.Label(self.scrollable_frame,
                                   text=self.i18n.t('no_scripts'),
                                   font=('Arial', 12),
@@ -443,7 +1067,7 @@ echo "Execution completed / 执行完成！"
         cards_container.pack(fill='both', expand=True)
         
         row, col = 0, 0
-        for i, script in enumerate(self.scripts):
+        for i, script in enumerate(scripts):
             card = self.create_script_card(cards_container, script)
             card.grid(row=row, column=col, padx=8, pady=8, sticky='nsew')
             
@@ -488,15 +1112,29 @@ echo "Execution completed / 执行完成！"
         content_frame = tk.Frame(card, bg='#1a5276')
         content_frame.pack(fill='both', expand=True, padx=14, pady=12)
         
-        title_label = tk.Label(content_frame,
-                              text=script['display_name'],
+        title_frame = tk.Frame(content_frame, bg='#1a5276')
+        title_frame.pack(anchor='w', pady=(0, 8))
+        
+        if script.icon:
+            icon_label = tk.Label(title_frame, bg='#1a5276', bd=0, highlightthickness=0)
+            icon_label.pack(side='left', padx=(0, 8))
+            
+            def set_icon(photo):
+                if icon_label.winfo_exists():
+                    icon_label.configure(image=photo)
+                    icon_label.image = photo
+            
+            self.image_cache.request(script.icon, (24, 24), set_icon)
+        
+        title_label = tk.Label(title_frame,
+                              text=script.display_name,
                               font=('Arial', 13, 'bold'),
                               fg='#ffffff',
                               bg='#1a5276')
-        title_label.pack(anchor='w', pady=(0, 8))
+        title_label.pack(side='left')
         
         desc_label = tk.Label(content_frame,
-                             text=script['description'],
+                             text=script.description,
                              font=('Arial', 9),
                              fg='#b0b0b0',
                              bg='#1a5276',
@@ -521,8 +1159,8 @@ echo "Execution completed / 执行完成！"
                                bg='#1a5276')
         status_label.pack(side='left', padx=(4, 0))
         
-        perm_text = self.i18n.t('requires_sudo') if script['requires_sudo'] else self.i18n.t('normal_user')
-        perm_color = '#e74c3c' if script['requires_sudo'] else '#27ae60'
+        perm_text = self.i18n.t('requires_sudo') if script.requires_sudo else self.i18n.t('normal_user')
+        perm_color = '#e74c3c' if script.requires_sudo else '#27ae60'
         
         perm_label = tk.Label(info_frame,
                              text=perm_text,
@@ -533,13 +1171,17 @@ echo "Execution completed / 执行完成！"
         perm_label.pack(side='right')
         
         def toggle_sudo(e):
-            script['requires_sudo'] = not script['requires_sudo']
-            self.update_script_sudo(script)
-            new_perm_text = self.i18n.t('requires_sudo') if script['requires_sudo'] else self.i18n.t('normal_user')
-            new_perm_color = '#e74c3c' if script['requires_sudo'] else '#27ae60'
+            # 通过注册表修改，保持权限索引同步
+            record = self.scripts.get(script.path)
+            if record is None:
+                return
+            self.scripts.set_sudo(record, not record.requires_sudo)
+            self.update_script_sudo(record)
+            new_perm_text = self.i18n.t('requires_sudo') if record.requires_sudo else self.i18n.t('normal_user')
+            new_perm_color = '#e74c3c' if record.requires_sudo else '#27ae60'
             perm_label.config(text=new_perm_text, fg=new_perm_color)
             messagebox.showinfo(self.i18n.t('success'), 
-                              f"{self.i18n.t('script_updated')}: {script['display_name']}\n{self.i18n.t('perm_updated')}: {new_perm_text}")
+                              f"{self.i18n.t('script_updated')}: {record.display_name}\n{self.i18n.t('perm_updated')}: {new_perm_text}")
         
         perm_label.bind("<Button-1>", toggle_sudo)
         
@@ -563,13 +1205,13 @@ echo "Execution completed / 执行完成！"
     def update_script_sudo(self, script):
         """更新脚本的REQUIRES_SUDO字段"""
         try:
-            with open(script['path'], 'r', encoding='utf-8') as f:
+            with open(script.path, 'r', encoding='utf-8') as f:
                 lines = f.readlines()
             
             updated = False
             for i, line in enumerate(lines):
                 if '# REQUIRES_SUDO:' in line:
-                    sudo_value = 'true' if script['requires_sudo'] else 'false'
+                    sudo_value = 'true' if script.requires_sudo else 'false'
                     lines[i] = f"# REQUIRES_SUDO: {sudo_value}\n"
                     updated = True
                     break
@@ -577,10 +1219,10 @@ echo "Execution completed / 执行完成！"
             if not updated:
                 for i, line in enumerate(lines):
                     if line.startswith('#!/'):
-                        lines.insert(i + 1, f"# REQUIRES_SUDO: {'true' if script['requires_sudo'] else 'false'}\n")
+                        lines.insert(i + 1, f"# REQUIRES_SUDO: {'true' if script.requires_sudo else 'false'}\n")
                         break
             
-            with open(script['path'], 'w', encoding='utf-8') as f:
+            with open(script.path, 'w', encoding='utf-8') as f:
                 f.writelines(lines)
         except Exception as e:
             messagebox.showerror(self.i18n.t('error'), f"{self.i18n.t('script_run_error')}: {str(e)}")
@@ -591,56 +1233,53 @@ echo "Execution completed / 执行完成！"
         thread.daemon = True
         thread.start()
     
+    def build_run_command(self, script):
+        """构建运行脚本的shell命令 - 脚本在伪终端中运行，输出同时写入运行日志"""
+        argv = [sys.executable, os.path.abspath(__file__), '--capture',
+                os.path.abspath(self.log_dir), script.name]
+        if script.requires_sudo:
+            argv.append('sudo')
+        argv += ['bash', os.path.abspath(script.path)]
+        capture = ' '.join(shlex.quote(arg) for arg in argv)
+        press_enter = shlex.quote(self.i18n.t('press_enter'))
+        return f'{capture}; echo ""; echo {press_enter}; read'
+    
     def _run_script_thread(self, script):
         """运行脚本的线程函数 - 修复Lubuntu QTerminal兼容性"""
         try:
-            script_path = os.path.abspath(script['path'])
+            script_path = os.path.abspath(script.path)
             terminal = self.get_terminal()
             
             if not terminal:
                 # 如果没找到终端，直接执行脚本（但不推荐）
-                if script['requires_sudo']:
+                if script.requires_sudo:
                     if self.check_command('pkexec'):
-                        subprocess.Popen(['pkexec', 'bash', script_path])
+                        cmd = ['pkexec', 'bash', script_path]
                     else:
-                        subprocess.Popen(['sudo', 'bash', script_path])
+                        cmd = ['sudo', 'bash', script_path]
                 else:
-                    subprocess.Popen(['bash', script_path])
+                    cmd = ['bash', script_path]
+                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                self.log_archive.capture(script.name, process.stdout)
+                process.wait()
                 return
             
-            press_enter = self.i18n.t('press_enter')
+            cmd = self.build_run_command(script)
             
             # 针对不同终端使用不同的命令格式
             if 'qterminal' in terminal:
                 # QTerminal (Lubuntu默认) 使用 -e 参数，但需要特殊格式
-                if script['requires_sudo']:
-                    # QTerminal 需要将整个命令作为一个参数传递
-                    subprocess.Popen([terminal, '-e', 'bash', '-c', 
-                                    f'sudo bash "{script_path}"; echo ""; echo "{press_enter}"; read'])
-                else:
-                    subprocess.Popen([terminal, '-e', 'bash', '-c', 
-                                    f'bash "{script_path}"; echo ""; echo "{press_enter}"; read'])
+                # QTerminal 需要将整个命令作为一个参数传递
+                subprocess.Popen([terminal, '-e', 'bash', '-c', cmd])
             elif 'lxterminal' in terminal:
                 # LXTerminal 需要使用 --command 参数
-                if script['requires_sudo']:
-                    cmd = f'bash -c "sudo bash \\"{script_path}\\"; echo \\"\\n{press_enter}\\"; read"'
-                    subprocess.Popen([terminal, '--command', cmd])
-                else:
-                    cmd = f'bash -c "bash \\"{script_path}\\"; echo \\"\\n{press_enter}\\"; read"'
-                    subprocess.Popen([terminal, '--command', cmd])
+                subprocess.Popen([terminal, '--command', f'bash -c {shlex.quote(cmd)}'])
             elif 'konsole' in terminal:
                 # Konsole 使用 --hold -e
-                if script['requires_sudo']:
-                    subprocess.Popen([terminal, '--hold', '-e', 'sudo', 'bash', script_path])
-                else:
-                    subprocess.Popen([terminal, '--hold', '-e', 'bash', script_path])
+                subprocess.Popen([terminal, '--hold', '-e', 'bash', '-c', cmd])
             else:
                 # gnome-terminal, xfce4-terminal, xterm 等使用标准格式
-                if script['requires_sudo']:
-                    cmd = f'bash -c \'sudo bash "{script_path}"; echo "\\n{press_enter}"; read\''
-                else:
-                    cmd = f'bash -c \'bash "{script_path}"; echo "\\n{press_enter}"; read\''
-                subprocess.Popen([terminal, '-e', cmd])
+                subprocess.Popen([terminal, '-e', f'bash -c {shlex.quote(cmd)}'])
                 
         except Exception as e:
             messagebox.showerror(self.i18n.t('error'), f"{self.i18n.t('script_run_error')}: {str(e)}")
@@ -673,6 +1312,197 @@ echo "Execution completed / 执行完成！"
                 return terminal
         return None
     
+    def run_background(self, task, callback, errback=None):
+        """在后台线程执行task，完成后在UI线程调用callback(result)，出错时调用errback(error)"""
+        def worker():
+            try:
+                self._background_results.put((callback, task()))
+            except Exception as e:
+                print(f"Background task error: {e}")
+                if errback is not None:
+                    self._background_results.put((errback, e))
+                else:
+                    self._background_results.put((None, None))
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self._background_pending += 1
+        if self._background_pending == 1:
+            self.root.after(30, self._poll_background)
+    
+    def _poll_background(self):
+        """处理已完成的后台任务"""
+        while True:
+            try:
+                handler, value = self._background_results.get_nowait()
+            except queue.Empty:
+                break
+            self._background_pending -= 1
+            if handler is not None:
+                try:
+                    handler(value)
+                except tk.TclError:
+                    # 窗口在任务执行期间已被关闭
+                    pass
+        
+        if self._background_pending:
+            self.root.after(30, self._poll_background)
+    
+    def segment_label(self, base):
+        """日志分段的显示文本：运行时间和脚本显示名称"""
+        # 分段名格式：YYYYmmdd-HHMMSS-<脚本名>-<随机后缀>.<分段号>
+        name, part = os.path.basename(base).rsplit('.', 1)
+        stamp = name[:15]
+        stem = name[16:].rsplit('-', 1)[0]
+        script = self.scripts.get_by_name(f"{stem}.sh")
+        label = f"{stamp}  {script.display_name if script else stem}"
+        return label if part == '000' else f"{label} ({int(part) + 1})"
+    
+    def open_log_viewer(self):
+        """打开运行日志查看器 - 读取和搜索在后台线程执行，不阻塞界面"""
+        page_size = 500
+        # request 用于丢弃过期的后台结果
+        state = {'segments': None, 'base': None, 'page': 0, 'results': None, 'request': 0}
+        
+        viewer = tk.Toplevel(self.root)
+        viewer.title(self.i18n.t('log_viewer'))
+        viewer.geometry("900x560")
+        viewer.configure(bg='#0f3460')
+        
+        search_frame = tk.Frame(viewer, bg='#0f3460')
+        search_frame.pack(fill='x', padx=10, pady=(10, 5))
+        
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=search_var, font=('Arial', 10))
+        search_entry.pack(side='left', fill='x', expand=True, padx=(0, 5))
+        
+        body_frame = tk.Frame(viewer, bg='#0f3460')
+        body_frame.pack(fill='both', expand=True, padx=10)
+        
+        segment_list = tk.Listbox(body_frame,
+                                  width=36,
+                                  font=('Arial', 9),
+                                  bg='#1a5276',
+                                  fg='#ffffff',
+                                  selectbackground='#00d4ff',
+                                  exportselection=False)
+        segment_list.pack(side='left', fill='y')
+        
+        log_text = tk.Text(body_frame, font=('Monospace', 9), bg='#000000', fg='#e0e0e0', wrap='none')
+        text_scroll = ttk.Scrollbar(body_frame, orient="vertical", command=log_text.yview)
+        log_text.configure(yscrollcommand=text_scroll.set)
+        log_text.pack(side='left', fill='both', expand=True, padx=(5, 0))
+        text_scroll.pack(side='right', fill='y')
+        
+        nav_frame = tk.Frame(viewer, bg='#0f3460')
+        nav_frame.pack(fill='x', padx=10, pady=(5, 10))
+        
+        page_label = tk.Label(nav_frame, font=('Arial', 9), fg='#a0a0a0', bg='#0f3460')
+        
+        def set_text(lines):
+            log_text.config(state='normal')
+            log_text.delete('1.0', 'end')
+            log_text.insert('end', '\n'.join(lines))
+            log_text.config(state='disabled')
+        
+        def update_segments(segments):
+            if segments == state['segments']:
+                return
+            state['segments'] = segments
+            segment_list.delete(0, 'end')
+            for base in segments:
+                segment_list.insert('end', self.segment_label(base))
+            if state['base'] in segments:
+                segment_list.selection_set(segments.index(state['base']))
+            if not segments:
+                set_text([self.i18n.t('log_empty')])
+        
+        def query(task, callback):
+            state['request'] += 1
+            request = state['request']
+            page_label.config(text=self.i18n.t('log_loading'))
+            
+            def on_done(result):
+                if request == state['request'] and viewer.winfo_exists():
+                    update_segments(result[0])
+                    callback(*result[1:])
+            
+            def on_error(error):
+                if request == state['request'] and viewer.winfo_exists():
+                    page_label.config(text=f"{self.i18n.t('error')}: {error}")
+            
+            self.run_background(lambda: (self.log_archive.list_segments(),) + task(), on_done, on_error)
+        
+        def show_page(see_line=None):
+            base = state['base']
+            if base is None:
+                return
+            state['results'] = None
+            requested_page = state['page']
+            
+            def load():
+                total = self.log_archive.line_count(base)
+                pages = max(1, (total + page_size - 1) // page_size)
+                page = max(0, min(requested_page, pages - 1))
+                return page, pages, self.log_archive.read_lines(base, page * page_size, page_size)
+            
+            def on_loaded(page, pages, lines):
+                state['page'] = page
+                set_text(f"{time.strftime('%H:%M:%S', time.localtime(stamp))}  {text}" for _, stamp, text in lines)
+                page_label.config(text=f"{self.i18n.t('log_page')} {page + 1}/{pages}")
+                if see_line is not None:
+                    log_text.see(f"{see_line % page_size + 1}.0")
+            
+            query(load, on_loaded)
+        
+        def change_page(delta):
+            state['page'] += delta
+            show_page()
+        
+        def on_select(event):
+            selection = segment_list.curselection()
+            if selection:
+                state['base'] = state['segments'][selection[0]]
+                state['page'] = 0
+                show_page()
+        
+        def do_search(event=None):
+            pattern = search_var.get().strip()
+            if not pattern:
+                return
+            
+            def on_found(results):
+                state['results'] = results
+                set_text(f"{os.path.basename(base)}:{line_no + 1}  {text}" for base, line_no, _, text in results)
+                page_label.config(text=f"{len(results)} {self.i18n.t('log_results')}")
+            
+            query(lambda: (self.log_archive.search(pattern),), on_found)
+        
+        def on_result_click(event):
+            # 双击搜索结果跳转到对应分段和页
+            if not state['results']:
+                return
+            row = int(log_text.index(f"@{event.x},{event.y}").split('.')[0]) - 1
+            if 0 <= row < len(state['results']):
+                base, line_no, _, _ = state['results'][row]
+                state['base'] = base
+                state['page'] = line_no // page_size
+                show_page(see_line=line_no)
+        
+        search_btn = self.create_modern_button(search_frame, self.i18n.t('log_search'), '#00d4ff', do_search)
+        search_btn.pack(side='left')
+        search_entry.bind("<Return>", do_search)
+        
+        prev_btn = self.create_modern_button(nav_frame, self.i18n.t('log_prev'), '#1a5276', lambda: change_page(-1))
+        prev_btn.pack(side='left')
+        page_label.pack(side='left', padx=10)
+        next_btn = self.create_modern_button(nav_frame, self.i18n.t('log_next'), '#1a5276', lambda: change_page(1))
+        next_btn.pack(side='left')
+        
+        segment_list.bind("<<ListboxSelect>>", on_select)
+        log_text.bind("<Double-Button-1>", on_result_click)
+        
+        query(lambda: (), lambda: page_label.config(text=''))
+    
     def refresh_scripts(self):
         """刷新脚本列表"""
         self.load_scripts()
@@ -690,6 +1520,11 @@ echo "Execution completed / 执行完成！"
 
 def main():
     """主函数"""
+    # 在伪终端中运行脚本并记录输出：python3 linux_script_manager.py --capture <日志目录> <脚本名> <命令...>
+    if len(sys.argv) >= 5 and sys.argv[1] == '--capture':
+        RunLogArchive(sys.argv[2]).run_in_pty(sys.argv[3], sys.argv[4:])
+        return
+    
     try:
         app = LinuxScriptManager()
         app.run()